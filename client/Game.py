@@ -1,6 +1,6 @@
-import queue, threading, time, math, logging
+import threading, time, math, logging
 from typing import List, Dict, Tuple, Optional
-from collections import defaultdict
+from collections import defaultdict, deque
 import cv2
 import numpy as np
 import pathlib
@@ -18,6 +18,12 @@ from ScreenOverlay import ScreenOverlay
 from enums.EventType import EventType
 logger = logging.getLogger(__name__)
 
+# BGR colours used on the per-frame draw path
+CURSOR_COLORS = {1: (0, 255, 0), 2: (255, 0, 0)}
+TEXT_WHITE = (255, 255, 255)
+
+FRAME_S = 1 / 60  # graphical loop cadence (~60 FPS)
+
 class InvalidBoard(Exception):
     pass
 
@@ -27,7 +33,10 @@ class Game:
         self.board = board
         self.game_id = game_id  # שמירת ה-game_id
         self.curr_board = None
-        self.user_input_queue = queue.Queue()
+        # Both keyboard producers append, the game loop pops; deque append and
+        # popleft are atomic, so no lock is needed. Unbounded, like the
+        # queue.Queue it replaced - no input is ever dropped
+        self.user_input_queue: deque = deque()
         self.piece_by_id = {p.id: p for p in pieces}
         self.pos: Dict[Tuple[int, int], List[Piece]] = defaultdict(list)
         self.START_NS = time.time_ns()
@@ -62,7 +71,37 @@ class Game:
         else:
             logger.error(f"Background image not found at {bg_path}")
             self.background = np.zeros((1080, 1920, 3), dtype=np.uint8)
+        # Background with the static footer already rendered; copied per frame
+        self._static_bg = self._build_static_background()
+        
+        # Frame geometry is fixed for the whole game - compute it once
+        board_h, board_w = self.board.img.img.shape[:2]
+        self._board_origin = ((1920 - board_w) // 2, (1080 - board_h) // 2)
+        cell_h, cell_w = self.board.cell_H_pix, self.board.cell_W_pix
+        # Persistent frame buffers, refilled in place every frame instead of
+        # allocating a fresh board clone and a fresh window-sized image
+        self._board_buf = self.board.clone()
+        self._frame_buf = np.empty_like(self._static_bg)
+        self._board_bgr = np.empty((board_h, board_w, 3), dtype=np.uint8)
+        self._cell_rects = [[(c * cell_w, r * cell_h, c * cell_w + cell_w - 1, r * cell_h + cell_h - 1)
+                             for c in range(self.board.W_cells)]
+                            for r in range(self.board.H_cells)]
     
+    def _build_static_background(self) -> np.ndarray:
+        """Render the parts of the frame that never change (background + Game ID)."""
+        win_w, win_h = 1920, 1080
+        bg = self.background.copy()
+        # הצגת Game ID בתחתית המסך
+        game_id_text = f"Game ID: {self.game_id}"
+        font = cv2.FONT_HERSHEY_SIMPLEX
+        font_scale = 0.8
+        thickness = 2
+        text_size = cv2.getTextSize(game_id_text, font, font_scale, thickness)[0]
+        text_x = (win_w - text_size[0]) // 2  # מרכז המסך
+        text_y = win_h - 30  # 30 פיקסלים מלמטה
+        cv2.putText(bg, game_id_text, (text_x, text_y), font, font_scale, TEXT_WHITE, thickness)
+        return bg
+
     def game_time_ms(self) -> int:
         """Return the game elapsed time in milliseconds."""
         return self._time_factor * (time.monotonic_ns() - self.START_NS) // 1_000_000
@@ -102,13 +141,17 @@ class Game:
 
     def _update_cell2piece_map(self):
         """Update dictionary mapping board cells to the pieces in them."""
-        self.pos.clear()
+        # Build a fresh map and swap it in, so the keyboard threads reading
+        # self.pos never observe a half-rebuilt map
+        pos: Dict[Tuple[int, int], List[Piece]] = defaultdict(list)
         for p in self.pieces:
-            self.pos[p.current_cell()].append(p)
+            pos[p.current_cell()].append(p)
+        self.pos = pos
 
     def _run_game_loop(self, num_iterations=None, is_with_graphics=True):
         iteration = 0
         while not self._is_win():
+            frame_start = time.monotonic()
             now = self.game_time_ms()
             for p in self.pieces:
                 p.update(now)
@@ -118,6 +161,12 @@ class Game:
                 self._draw()
                 self._show()
             self._resolve_collisions()
+            if is_with_graphics:
+                # Sleep off the rest of the frame instead of spinning; physics
+                # is time-based, so a lower tick rate doesn't change gameplay
+                remaining = FRAME_S - (time.monotonic() - frame_start)
+                if remaining > 0:
+                    time.sleep(remaining)
             if num_iterations is not None:
                 iteration += 1
                 if iteration >= num_iterations:
@@ -139,18 +188,15 @@ class Game:
 
     def _draw(self):
         """Draw the current game board and overlays (key markers, move log)."""
-        self.curr_board = self.clone_board()
+        np.copyto(self._board_buf.img.img, self.board.img.img)
+        self.curr_board = self._board_buf
         for p in self.pieces:
             p.draw_on_board(self.curr_board, now_ms=self.game_time_ms())
         if self.kp1 and self.kp2:
             for player, kp, last_attr in ((1, self.kp1, 'last_cursor1'), (2, self.kp2, 'last_cursor2')):
                 r, c = kp.get_cursor()
-                y1 = r * self.board.cell_H_pix
-                x1 = c * self.board.cell_W_pix
-                y2 = y1 + self.board.cell_H_pix - 1
-                x2 = x1 + self.board.cell_W_pix - 1
-                color = (0, 255, 0) if player == 1 else (255, 0, 0)
-                self.curr_board.img.draw_rect(x1, y1, x2, y2, color)
+                x1, y1, x2, y2 = self._cell_rects[r][c]
+                self.curr_board.img.draw_rect(x1, y1, x2, y2, CURSOR_COLORS[player])
                 prev = getattr(self, last_attr)
                 if prev != (r, c):
                     logger.debug("Marker P%s moved to (%s, %s)", player, r, c)
@@ -159,14 +205,14 @@ class Game:
 
     def _show(self):
         """Display the current board image on the game window."""
-        win_w, win_h = 1920, 1080
-        bg = self.background.copy()
+        win_w = 1920
+        bg = self._frame_buf
+        np.copyto(bg, self._static_bg)
         board_img = self.curr_board.img.img
         if board_img is not None and board_img.shape[2] == 4:
-            board_img = cv2.cvtColor(board_img, cv2.COLOR_BGRA2BGR)
+            board_img = cv2.cvtColor(board_img, cv2.COLOR_BGRA2BGR, dst=self._board_bgr)
         board_h, board_w = board_img.shape[:2]
-        x0 = (win_w - board_w) // 2
-        y0 = (win_h - board_h) // 2
+        x0, y0 = self._board_origin
         bg[y0:y0+board_h, x0:x0+board_w] = board_img
 
         if hasattr(self, "scoreboard"):
@@ -175,24 +221,16 @@ class Game:
         self.move_log.draw(bg, origin=(50, 150), player="WHITE", player_name=self.player_names["WHITE"])
         self.move_log.draw(bg, origin=(win_w - 300, 150), player="BLACK", player_name=self.player_names["BLACK"])
         
-        # הצגת Game ID בתחתית המסך
-        game_id_text = f"Game ID: {self.game_id}"
-        font = cv2.FONT_HERSHEY_SIMPLEX
-        font_scale = 0.8
-        color = (255, 255, 255)  # לבן
-        thickness = 2
-        text_size = cv2.getTextSize(game_id_text, font, font_scale, thickness)[0]
-        text_x = (win_w - text_size[0]) // 2  # מרכז המסך
-        text_y = win_h - 30  # 30 פיקסלים מלמטה
-        cv2.putText(bg, game_id_text, (text_x, text_y), font, font_scale, color, thickness)
-        
         cv2.imshow(self.window_name, bg)
         cv2.waitKey(1)
 
     def _process_all_inputs(self):
         """Process all commands from the input queue."""
-        while not self.user_input_queue.empty():
-            cmd: Command = self.user_input_queue.get()
+        while True:
+            try:
+                cmd: Command = self.user_input_queue.popleft()
+            except IndexError:
+                break
             self._process_input(cmd)
 
     def _process_input(self, cmd: Command):
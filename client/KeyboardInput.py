@@ -83,10 +83,9 @@ class KeyboardProducer(threading.Thread):
         keyboard.wait()
 
     def _find_piece_at(self, cell):
-        for p in self.game.pieces:
-            if p.current_cell() == cell:
-                return p
-        return None
+        # O(1) lookup in the game's cell→pieces index (rebuilt every tick)
+        pieces = self.game.pos.get(cell)
+        return pieces[0] if pieces else None
 
     def _on_event(self, event):
         action = self.proc.process_key(event)
@@ -150,7 +149,7 @@ class KeyboardProducer(threading.Thread):
                     [self.selected_cell, cell]
                 )
                 # the command enter to the game queue
-                self.queue.put(cmd)
+                self.queue.append(cmd)
                 logger.info(f"Player{self.player} queued {cmd}")
                 self.selected_id = None
                 self.selected_cell = None
@@ -172,7 +171,7 @@ class KeyboardProducer(threading.Thread):
                 "jump",
                 [self.selected_cell]  # Pass current cell to the command
             )
-            self.queue.put(cmd)
+            self.queue.append(cmd)
             logger.info(f"Player{self.player} queued {cmd}")
             # We don't deselect the piece after a jump
 
@@ -7,6 +7,7 @@ import numpy as np
 class Img:
     def __init__(self):
         self.img = None
+        self._blend = None  # cached (1 - alpha, alpha * rgb) for draw_on
 
     def read(self, path: str | pathlib.Path,
              size: tuple[int, int] | None = None,
@@ -34,6 +35,7 @@ class Img:
             `self`, so you can chain:  `sprite = Img().read("foo.png", (64,64))`
         """
         path = str(path)
+        self._blend = None
         
         # Handle Hebrew/Unicode characters in path for OpenCV
         try:
@@ -97,6 +99,7 @@ class Img:
                 self.img = cv2.cvtColor(self.img, cv2.COLOR_BGR2BGRA)
             elif self.img.shape[2] == 4 and other_img.img.shape[2] == 3:
                 self.img = cv2.cvtColor(self.img, cv2.COLOR_BGRA2BGR)
+            self._blend = None
 
         h, w = self.img.shape[:2]
         H, W = other_img.img.shape[:2]
@@ -112,10 +115,14 @@ class Img:
         roi = other_img.img[y:y + h, x:x + w]
 
         if self.img.shape[2] == 4:
-            b, g, r, a = cv2.split(self.img)
-            mask = a / 255.0
-            for c in range(3):
-                roi[..., c] = (1 - mask) * roi[..., c] + mask * self.img[..., c]
+            # Sprites are drawn every frame but never change, so the alpha
+            # terms are computed once per sprite; per frame it is one
+            # multiply-add over the colour channels (alpha is HxWx1)
+            if self._blend is None:
+                mask = self.img[..., 3:4].astype(np.float32) / 255.0
+                self._blend = (1 - mask, mask * self.img[..., :3])
+            inv_mask, premul = self._blend
+            roi[..., :3] = inv_mask * roi[..., :3] + premul
         else:
             other_img.img[y:y + h, x:x + w] = self.img
 
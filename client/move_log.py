@@ -1,17 +1,21 @@
 from enums.EventType import EventType
 from message_bus import subscribe
 import time
+from collections import deque
 import cv2
 
 MAX_ROWS = 8  # Maximum number of recent moves displayed per player
 ROW_HEIGHT = 22  # Row height in pixels
+WHITE = (255, 255, 255)
+BLACK = (0, 0, 0)
 
 class MoveLog:
     """
     Records every move and can draw a graphical table on screen.
     """
     def __init__(self):
-        self.moves = {"WHITE": [], "BLACK": []}
+        # Bounded: appending past MAX_ROWS drops the oldest move
+        self.moves = {"WHITE": deque(maxlen=MAX_ROWS), "BLACK": deque(maxlen=MAX_ROWS)}
         subscribe(EventType.PIECE_MOVED, self._record)
 
     def _record(self, data):
@@ -19,8 +23,6 @@ class MoveLog:
         player = "WHITE" if piece_id[1] == "W" else "BLACK"
         current_time = time.strftime("%H:%M:%S", time.localtime())
         self.moves[player].append((current_time, piece_id))
-        for key in ("WHITE", "BLACK"):
-            self.moves[key] = self.moves[key][-MAX_ROWS:]
 
     def draw(self, img, origin=(1660, 30), player="WHITE", player_name=None):
         """
@@ -32,13 +34,15 @@ class MoveLog:
         width, height = 250, 1080 - 60
 
         # Draw white background
-        cv2.rectangle(img, (x0 - 10, y0 - 30), (x0 + width, y0 + height), (255, 255, 255), -1)
+        cv2.rectangle(img, (x0 - 10, y0 - 30), (x0 + width, y0 + height), WHITE, -1)
         # Title with player name
         display_name = player_name if player_name else player
-        cv2.putText(img, f"{display_name} Moves", (x0 + 10, y0), font, 0.7, (0, 0, 0), 2, cv2.LINE_AA)
+        cv2.putText(img, f"{display_name} Moves", (x0 + 10, y0), font, 0.7, BLACK, 2, cv2.LINE_AA)
         y0 += ROW_HEIGHT
-        cv2.putText(img, "Time       Move", (x0 + 10, y0), font, scale, (0, 0, 0), thickness, cv2.LINE_AA)
+        cv2.putText(img, "Time       Move", (x0 + 10, y0), font, scale, BLACK, thickness, cv2.LINE_AA)
         y0 += ROW_HEIGHT
-        for t, m in self.moves[player]:
-            cv2.putText(img, f"{t}  {m}", (x0 + 10, y0), font, scale, (0, 0, 0), thickness, cv2.LINE_AA)
+        # Snapshot: _record appends from the network thread while this draws,
+        # and a deque mutated mid-iteration raises
+        for t, m in tuple(self.moves[player]):
+            cv2.putText(img, f"{t}  {m}", (x0 + 10, y0), font, scale, BLACK, thickness, cv2.LINE_AA)
             y0 += ROW_HEIGHT
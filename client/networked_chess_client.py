@@ -4,7 +4,6 @@ Networked Chess Game Client
 
 import asyncio
 import websockets
-import json
 import threading
 import queue
 import time
@@ -13,13 +12,18 @@ import sys
 import os
 from typing import Optional, Dict, Tuple
 
+try:
+    import uvloop  # libuv-based event loop; not available on Windows
+except ImportError:
+    uvloop = None
+
 current_dir = os.path.dirname(__file__)
 shared_dir = os.path.join(current_dir, '..', 'shared')
 sys.path.insert(0, current_dir)
 sys.path.insert(0, shared_dir)
 
 from protocol import (
-    ProtocolMessage, MessageType,
+    ProtocolMessage, MessageType, parse_message_type,
     create_player_join_message, create_player_move_message,
     DEFAULT_SERVER_PORT, DEFAULT_SERVER_HOST
 )
@@ -32,6 +36,9 @@ from enums.EventType import EventType
 
 logger = logging.getLogger(__name__)
 
+# Constant reply to server pings - encoded once instead of per ping
+_PONG = ProtocolMessage(MessageType.PONG, {}).to_json()
+
 class NetworkedChessClient:
     
     def __init__(self, player_name: str, preferred_color: str = None):
@@ -49,13 +56,16 @@ class NetworkedChessClient:
         self.game_started = False
         self.processing_opponent_move = False
         
-        self.server_message_queue = queue.Queue()
         self.move_queue = queue.Queue()
         
         self.game_thread = None
+        # The one event loop that owns the socket; the game thread schedules
+        # coroutines onto it with run_coroutine_threadsafe
+        self.network_loop: Optional[asyncio.AbstractEventLoop] = None
         self.running = False
         
     async def connect_to_server(self):
+        self.network_loop = asyncio.get_running_loop()
         try:
             # Generate a unique player ID
             import uuid
@@ -64,7 +74,10 @@ class NetworkedChessClient:
             uri = f"ws://{DEFAULT_SERVER_HOST}:{DEFAULT_SERVER_PORT}/ws/{self.player_id}"
             logger.info(f"Connecting to {uri}...")
             
-            self.websocket = await websockets.connect(uri)
+            # Game frames are small JSON; per-frame deflate costs more than it saves.
+            # max_queue stays at the library default: websockets already reads
+            # frames in its own task and that bounded buffer is the back-pressure
+            self.websocket = await websockets.connect(uri, compression=None)
             self.connected = True
             logger.info("Connected to server!")
             
@@ -97,31 +110,52 @@ class NetworkedChessClient:
             logger.debug(f"Received raw message: {message}")
             protocol_msg = ProtocolMessage.from_json(message)
             logger.debug(f"Parsed protocol message: type={protocol_msg.type}, data={protocol_msg.data}")
-            message_type = MessageType(protocol_msg.type)
-            
-            if message_type == MessageType.GAME_STATE:
-                await self.handle_game_state(protocol_msg.data)
-            elif message_type == MessageType.GAME_UPDATE:
-                await self.handle_game_state(protocol_msg.data)  # Same handler as GAME_STATE
-            elif message_type == MessageType.ERROR:
-                await self.handle_error(protocol_msg.data)
-            elif message_type == MessageType.PING:
-                # Respond to ping with pong
-                pong_msg = ProtocolMessage(MessageType.PONG, {})
-                await self.websocket.send(pong_msg.to_json())
-                logger.debug("Responded to ping with pong")
-            elif message_type == MessageType.MOVE_MADE:
-                self.handle_move_from_server(protocol_msg.data)
-            elif protocol_msg.type == "MOVE_MADE":  # Keep for backward compatibility
-                self.handle_move_from_server(protocol_msg.data)
+            message_type = protocol_msg.type  # already resolved by from_json
+            
+            if message_type == MessageType.BATCH:
+                await self.handle_batch(protocol_msg.data)
             else:
-                logger.info(f"Received message: {message_type.value}")
+                await self.dispatch_message(message_type, protocol_msg.data)
                 
         except Exception as e:
             logger.error(f"Error handling message: {e}")
             import traceback
             traceback.print_exc()
             
+    async def dispatch_message(self, message_type: MessageType, data: dict):
+        if message_type == MessageType.GAME_STATE:
+            await self.handle_game_state(data)
+        elif message_type == MessageType.GAME_UPDATE:
+            await self.handle_game_state(data)  # Same handler as GAME_STATE
+        elif message_type == MessageType.ERROR:
+            await self.handle_error(data)
+        elif message_type == MessageType.PING:
+            # Respond to ping with pong
+            await self.websocket.send(_PONG)
+            logger.debug("Responded to ping with pong")
+        elif message_type == MessageType.MOVE_MADE:
+            self.handle_move_from_server(data)
+        else:
+            logger.info(f"Received message: {message_type.value}")
+            
+    async def handle_batch(self, items: list):
+        """Handle several messages the server packed into one frame.
+        
+        Every game_state/game_update supersedes the previous one, so only the
+        last state in the batch is applied - in its place, since messages
+        after it are newer. Everything else keeps its order.
+        """
+        state_types = (MessageType.GAME_STATE, MessageType.GAME_UPDATE)
+        types = [parse_message_type(item["type"]) for item in items]
+        last_state = max((i for i, t in enumerate(types) if t in state_types), default=-1)
+        for i, (item, message_type) in enumerate(zip(items, types)):
+            if message_type is None:
+                logger.warning(f"Unknown message type in batch: {item['type']}")
+            elif message_type in state_types and i != last_state:
+                continue  # superseded by a later state in this batch
+            else:
+                await self.dispatch_message(message_type, item.get("data", {}))
+            
     async def handle_game_state(self, data: dict):
         game_status = data.get('status', 'unknown')  # Changed from 'game_status' to 'status'
         players = data.get('players', {})
@@ -143,8 +177,9 @@ class NetworkedChessClient:
         elif game_status == 'ready':
             print(f"Game is ready with {len(players)} players!")
         
-        # Update player names in game if we have both players
-        if self.game and len(players) >= 2:
+        # Update player names in game if we have both players and the roster
+        # actually changed - most pushes carry the same players as before
+        if self.game and len(players) >= 2 and players != getattr(self, 'last_players_data', None):
             self.update_player_names(players)
         
         # Store player data for later use
@@ -171,11 +206,6 @@ class NetworkedChessClient:
         elif (game_status == 'ongoing' or game_status == 'active') and len(players) < 2:
             logger.warning(f"Game status is {game_status} but only {len(players)} players - not starting game")
             print(f"⚠️ Game status is {game_status} but only {len(players)} players connected")
-            
-        self.server_message_queue.put({
-            'type': 'game_state',
-            'data': data
-        })
         
     def update_player_colors(self):
         if not self.my_color or not self.game:
@@ -347,7 +377,7 @@ class NetworkedChessClient:
         finally:
             try:
                 os.chdir(original_cwd)
-            except:
+            except OSError:
                 pass
             self.running = False
             
@@ -360,23 +390,6 @@ class NetworkedChessClient:
         
         self.game.networked_client = self
         
-        original_process_all_inputs = self.game._process_all_inputs
-        
-        def networked_process_all_inputs():
-            try:
-                while not self.server_message_queue.empty():
-                    msg = self.server_message_queue.get_nowait()
-                    if msg['type'] == 'game_state':
-                        logger.debug("Ignoring game_state update to prevent animation interruption")
-                    elif msg['type'] == 'move_made':
-                        self.handle_move_from_server(msg['data'])
-            except queue.Empty:
-                pass
-                
-            original_process_all_inputs()
-                    
-        self.game._process_all_inputs = networked_process_all_inputs
-        
         original_process_input = self.game._process_input
         
         def networked_process_input(cmd):
@@ -443,8 +456,6 @@ async def main():
         if not client.connected:
             logger.error("Failed to connect to server")
             return
-            
-        client.network_loop = asyncio.get_event_loop()
         
         await client.listen_to_server()
         
@@ -463,6 +474,9 @@ if __name__ == "__main__":
     print("Make sure the server is running on localhost:8000")
     print("Press Ctrl+C to quit")
     
+    if uvloop is not None:
+        uvloop.install()
+    
     try:
         asyncio.run(main())
     except KeyboardInterrupt:
@@ -3,6 +3,8 @@ import cv2
 from enums.EventType import EventType
 from message_bus import subscribe
 
+TEXT_COLOR = (255, 255, 255)
+
 class ScoreBoard:
     """
     Displays and updates the game scoreboard.
@@ -28,4 +30,4 @@ class ScoreBoard:
         font = cv2.FONT_HERSHEY_SIMPLEX
         display_name = player_name if player_name else player
         text = f"{display_name}: {self.scores[player]}"
-        cv2.putText(img, text, origin, font, 1, (255, 255, 255), 2, cv2.LINE_AA)
+        cv2.putText(img, text, origin, font, 1, TEXT_COLOR, 2, cv2.LINE_AA)
@@ -13,19 +13,14 @@ def run_test(test_path, test_name):
     print('='*60)
     
     try:
-        # שנה לתיקיית הבדיקה
-        original_dir = os.getcwd()
+        # הבדיקה רצה בתיקייה שלה דרך cwd של התהליך - בלי os.chdir גלובלי
         test_dir = os.path.dirname(test_path)
         test_file = os.path.basename(test_path)
         
-        os.chdir(test_dir)
-        
         # הרץ את הבדיקה
-        result = subprocess.run([sys.executable, test_file], 
+        result = subprocess.run([sys.executable, test_file], cwd=test_dir,
                               capture_output=True, text=True, timeout=30)
         
-        os.chdir(original_dir)
-        
         if result.returncode == 0:
             print(f"✓ בדיקה עברה בהצלחה: {test_name}")
             if result.stdout:
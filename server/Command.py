@@ -1,7 +1,7 @@
 from dataclasses import dataclass, field
 from typing import List, Dict, Tuple, Optional
 
-@dataclass
+@dataclass(slots=True)
 class Command:
     timestamp: int          # ms since game start
     piece_id: str
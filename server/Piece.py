@@ -12,35 +12,44 @@ class Piece:
     def __init__(self, piece_id: str, init_state: State):
         self.id = piece_id
         self.state = init_state
+        # Fields decoded from the immutable id once, so per-tick code never
+        # slices or startswith()-scans the id string
+        self._kind = piece_id[0]
+        self._color_bit = 0 if piece_id[1] == "W" else 1
+        self._is_king = piece_id[0] == "K"
         self._last_cell = self.current_cell()  # Store the last cell
+        # PIECE_MOVED payload, reused on every move - publish() is synchronous
+        # and subscribers only read it, so one dict per piece is enough
+        self._move_payload = {"piece": self, "piece_id": self.id, "from": None, "to": None}
 
     def on_command(self, cmd: Command, cell2piece: Dict[Tuple[int, int], List[Piece]]):
         """Process a command and potentially transition to a new state.
            After executing the command, if the piece actually moved - publish a movement event.
         """
         my_color = self.id[1]
-        prev_cell = self.current_cell()
+        prev_cell = self._last_cell
         self.state = self.state.on_command(cmd, cell2piece, my_color)
-        new_cell = self.current_cell()
+        new_cell = self.state.physics.get_curr_cell()
         if prev_cell != new_cell:
            ####
             self._last_cell = new_cell
 
     def reset(self, start_ms: int):
         self.state.reset(Command(start_ms, self.id, "idle", [self.current_cell()]))
+        self._last_cell = self.current_cell()
 
     def update(self, now_ms: int):
-        prev_cell = self.current_cell()
+        # _last_cell is kept in sync by every path that changes state, so the
+        # previous cell needs no trip through state → physics
+        prev_cell = self._last_cell
         self.state = self.state.update(now_ms)
-        new_cell = self.current_cell()
+        new_cell = self.state.physics.get_curr_cell()
         # if the piece move we publish an event
         if prev_cell != new_cell:
-            publish(EventType.PIECE_MOVED, {
-                "piece": self,
-                "piece_id": self.id,  
-                "from": prev_cell,
-                "to": new_cell,
-            })
+            payload = self._move_payload
+            payload["from"] = prev_cell
+            payload["to"] = new_cell
+            publish(EventType.PIECE_MOVED, payload)
         self._last_cell = new_cell
 
     def is_movement_blocker(self) -> bool:
@@ -92,7 +92,9 @@ class PieceFactory:
         p_dir = self._pieces_root / p_type
         state = self._build_state_machine(p_dir)
 
-        piece = Piece(f"{p_type}_{cell}", state)
-        piece.state.reset(Command(0, piece.id, "idle", [cell]))
+        # Place the state on its cell first so Piece caches the right cell
+        piece_id = f"{p_type}_{cell}"
+        state.reset(Command(0, piece_id, "idle", [cell]))
+        piece = Piece(piece_id, state)
 
         return piece
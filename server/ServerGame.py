@@ -3,13 +3,14 @@ Game.py - Server Version (No GUI/Client Dependencies)
 Pure game logic for server-side processing
 """
 
-import queue, threading, time, math, logging
+import threading, time, math, logging
 from typing import List, Dict, Tuple, Optional
-from collections import defaultdict
+from collections import deque
 
 from Board import Board
 from Command import Command
 from State import State
+from Physics import IdlePhysics
 from Piece import Piece
 from move_log import MoveLog
 from message_bus import publish
@@ -17,23 +18,59 @@ from enums.EventType import EventType
 
 logger = logging.getLogger(__name__)
 
+# Piece-type letter (first char of the piece id) → type name
+_PIECE_TYPES = {
+    "P": "pawn",
+    "R": "rook",
+    "N": "knight",
+    "B": "bishop",
+    "Q": "queen",
+    "K": "king"
+}
+
+# Piece._color_bit → colour name
+_COLOR_NAMES = ("white", "black")
+
 class InvalidBoard(Exception):
     pass
 
 class ServerGame:
     """Server-side game logic without GUI dependencies"""
+
+    __slots__ = ('pieces', 'board', 'game_id', 'curr_board', 'user_input_queue',
+                 'piece_by_id', 'pos', 'occ_white', 'occ_black', 'START_NS',
+                 '_time_factor', 'move_log', '_active', '_spare_lists',
+                 '_kings_alive')
     
     def __init__(self, pieces: List[Piece], board: Board, game_id: str = "Unknown"):
         self.pieces = pieces
         self.board = board
         self.game_id = game_id  # שמירת ה-game_id
         self.curr_board = None
-        self.user_input_queue = queue.Queue()
+        self.user_input_queue: deque = deque()  # single-threaded asyncio server, no lock needed
         self.piece_by_id = {p.id: p for p in pieces}
-        self.pos: Dict[Tuple[int, int], List[Piece]] = defaultdict(list)
-        self.START_NS = time.time_ns()
+        self.pos: Dict[Tuple[int, int], List[Piece]] = {}
+        # Emptied cell lists, handed back out instead of allocating new ones
+        self._spare_lists: List[List[Piece]] = []
+        # Occupancy bitboards (bit = row * W_cells + col), maintained with self.pos
+        self.occ_white: int = 0
+        self.occ_black: int = 0
+        self.START_NS = time.monotonic_ns()  # same clock game_time_ms reads
         self._time_factor = 1  
         self.move_log = MoveLog()
+        # Pieces not at rest - the only ones update() can change. At rest means
+        # IdlePhysics (idle, idle_after_first_move, ...): its update() never
+        # produces a transition, whatever the state is called
+        self._active: set[Piece] = set()
+        # Live kings per colour (indexed by Piece._color_bit), decremented on
+        # capture so game-over checks never scan the pieces
+        self._kings_alive = [0, 0]
+        for p in pieces:
+            if p._is_king:
+                self._kings_alive[p._color_bit] += 1
+        # Built once here; from then on pieces are moved in / out of it
+        # incrementally as they change cells or get captured
+        self._update_cell2piece_map()
         
         # Server doesn't need GUI components
         # No cv2.namedWindow, no scoreboard, no voice, no screen_overlay
@@ -49,31 +86,82 @@ class ServerGame:
 
     def _update_cell2piece_map(self):
         """Update dictionary mapping board cells to the pieces in them."""
+        for pieces_at_cell in self.pos.values():
+            pieces_at_cell.clear()
+            self._spare_lists.append(pieces_at_cell)
         self.pos.clear()
+        self.occ_white = self.occ_black = 0
         for p in self.pieces:
-            self.pos[p.current_cell()].append(p)
+            self._place(p, p.current_cell())
+
+    def _cell_bit(self, cell: Tuple[int, int]) -> int:
+        return 1 << (cell[0] * self.board.W_cells + cell[1])
+
+    def _place(self, p: Piece, cell: Tuple[int, int]):
+        """Add a piece to the cell map and its colour's occupancy bitboard."""
+        pieces_at_cell = self.pos.get(cell)
+        if pieces_at_cell is None:
+            spare = self._spare_lists
+            pieces_at_cell = self.pos[cell] = spare.pop() if spare else []
+        pieces_at_cell.append(p)
+        if p._color_bit == 0:
+            self.occ_white |= self._cell_bit(cell)
+        else:
+            self.occ_black |= self._cell_bit(cell)
+
+    def _unplace(self, p: Piece, cell: Tuple[int, int]):
+        """Remove a piece from the cell map, clearing its colour bit if it was the last one there."""
+        pieces_at_cell = self.pos[cell]
+        pieces_at_cell.remove(p)  # a cell holds at most a handful of pieces
+        if not pieces_at_cell:
+            # Moves.is_valid treats any key in the map as an occupied cell
+            del self.pos[cell]
+            self._spare_lists.append(pieces_at_cell)
+        color = p._color_bit
+        if any(q._color_bit == color for q in pieces_at_cell):
+            return
+        if color == 0:
+            self.occ_white &= ~self._cell_bit(cell)
+        else:
+            self.occ_black &= ~self._cell_bit(cell)
+
+    def _relocate(self, p: Piece, old_cell: Tuple[int, int]):
+        """Move a piece's cell map entry from old_cell to its current cell."""
+        self._unplace(p, old_cell)
+        self._place(p, p._last_cell)
 
     def process_move_command(self, piece_id: str, target_cell: Tuple[int, int]) -> bool:
         """Process a single move command (server-side)"""
-        logger.info(f"Processing move command: {piece_id} to {target_cell}")
+        logger.debug("Processing move command: %s to %s", piece_id, target_cell)
         
         piece = self.piece_by_id.get(piece_id)
         if not piece:
             logger.warning(f"Unknown piece id {piece_id}")
             return False
             
-        # Create command
+        # Create command - physics starts the move from params[0], so that is
+        # the piece's own cell, not a client-supplied one
         cmd = Command(
             timestamp=self.game_time_ms(),
             piece_id=piece_id,
             type="move",
-            params=["move", target_cell]
+            params=[piece._last_cell, target_cell]
         )
         
         # Process the command
         try:
+            prev_cell = piece._last_cell
+            prev_state = piece.state
             piece.on_command(cmd, self.pos)
-            logger.info(f"Processed command: {cmd} for piece {piece_id}")
+            if piece.state is prev_state:
+                # No transition: an illegal move, or the piece cannot move now
+                logger.warning(f"Move rejected for {piece_id}: {prev_cell} -> {target_cell}")
+                return False
+            if piece._last_cell != prev_cell:
+                self._relocate(piece, prev_cell)
+            if not isinstance(piece.state.physics, IdlePhysics):
+                self._active.add(piece)
+            logger.debug("Processed command: %s for piece %s", cmd, piece_id)
             publish(EventType.PIECE_MOVED, {"piece_id": piece_id, "target_cell": target_cell})
             
             return True
@@ -91,124 +179,162 @@ class ServerGame:
         return self.process_move_command(cmd.piece_id, target_cell)
 
     def update_game_state(self) -> bool:
-        """Update game state (physics, collisions) - server version"""
+        """Update game state (physics, collisions) - server version.
+
+        Returns True if a piece changed cells or was captured this tick.
+        """
         try:
+            # Read once per tick and handed to every callee, so the whole tick
+            # sees one time without caching it past the tick
             now = self.game_time_ms()
             
-            # Update all pieces
-            for p in self.pieces:
+            # Idle pieces have no physics to advance, and with nothing
+            # moving no collision can have appeared since the last tick
+            active = self._active
+            if not active:
+                return False
+
+            # Update active pieces - the position map follows only the ones
+            # that actually changed cells this tick. The check stays inline
+            # so a stationary piece costs one comparison, not a method call
+            relocate = self._relocate
+            settled = []
+            moved = False
+            for p in active:
+                prev_cell = p._last_cell
                 p.update(now)
-            
-            # Update position map
-            self._update_cell2piece_map()
+                if p._last_cell != prev_cell:
+                    relocate(p, prev_cell)
+                    moved = True
+                if isinstance(p.state.physics, IdlePhysics):
+                    settled.append(p)
+            active.difference_update(settled)
             
             # Resolve collisions
-            self._resolve_collisions()
+            captured = self._resolve_collisions()
             
-            return True
+            return moved or captured
             
         except Exception as e:
             logger.error(f"Error updating game state: {e}")
             return False
 
-    def _resolve_collisions(self):
-        """Resolve collisions on board cells where more than one piece is present."""
-        self._update_cell2piece_map()
-        for cell, pieces_at_cell in self.pos.items():
-            if len(pieces_at_cell) < 2:
-                continue
-            logger.debug("Collision detected at %s: %s", cell, [p.id for p in pieces_at_cell])
+    def _resolve_collisions(self) -> bool:
+        """Resolve collisions on board cells where more than one piece is present.
+
+        Returns True if any piece was captured.
+        """
+        # Only a cell holding pieces of both colours can produce a capture, so
+        # walk the set bits of white & black - nothing to visit on quiet ticks
+        collisions = self.occ_white & self.occ_black
+        if not collisions:
+            return False
+        w_cells = self.board.W_cells
+        captured_ids = set()
+        # Checked once per call: the argument lists below (notably the id
+        # comprehension) are built even when the record is then discarded
+        log_debug = logger.isEnabledFor(logging.DEBUG)
+        while collisions:
+            low = collisions & -collisions
+            collisions ^= low
+            cell = divmod(low.bit_length() - 1, w_cells)
+            pieces_at_cell = self.pos[cell]
+            if log_debug:
+                logger.debug("Collision detected at %s: %s", cell, [p.id for p in pieces_at_cell])
             winner = self._determine_collision_winner(pieces_at_cell)
+            captured = []
             for p in pieces_at_cell:
                 if p is winner:
                     continue
-                if winner.id[1] == p.id[1]:
-                    logger.debug("Skipping capture: %s and %s are the same color", winner.id, p.id)
+                if winner._color_bit == p._color_bit:
+                    if log_debug:
+                        logger.debug("Skipping capture: %s and %s are the same color", winner.id, p.id)
                     continue
                 if p.state.can_be_captured():
                     logger.info("CAPTURE: %s captures %s at %s", winner.id, p.id, cell)
                     publish(EventType.PIECE_CAPTURED, {"victim": p, "winner": winner})
-                    self.pieces.remove(p)
-                else:
+                    captured.append(p)
+                elif log_debug:
                     logger.debug("Piece %s cannot be captured (state: %s)", p.id, p.state.name)
+            for p in captured:
+                self._unplace(p, cell)
+                captured_ids.add(p.id)
+                if p._is_king:
+                    self._kings_alive[p._color_bit] -= 1
+        # Compact once per tick instead of a linear list.remove() per capture
+        if captured_ids:
+            self.pieces = [p for p in self.pieces if p.id not in captured_ids]
+            self._active = {p for p in self._active if p.id not in captured_ids}
+            for pid in captured_ids:
+                self.piece_by_id.pop(pid, None)
+        return bool(captured_ids)
 
     def _determine_collision_winner(self, pieces_at_cell: List[Piece]) -> Piece:
-        """Determine the winning piece in a collision based on movement and start time."""
-        moving = [p for p in pieces_at_cell if p.state.name != 'idle']
-        if moving:
-            winner = max(moving, key=lambda p: p.state.physics.get_start_ms())
-            logger.debug("Winner (moving): %s (state: %s)", winner.id, winner.state.name)
-        else:
-            winner = max(pieces_at_cell, key=lambda p: p.state.physics.get_start_ms())
-            logger.debug("Winner (idle): %s (state: %s)", winner.id, winner.state.name)
+        """Determine the winning piece in a collision based on movement and start time.
+
+        A moving piece beats an idle one; among equals the latest start wins.
+        """
+        winner = None
+        best = (False, -1)
+        for p in pieces_at_cell:
+            state = p.state
+            key = (state.name != 'idle', state.physics.get_start_ms())
+            if key > best:
+                winner, best = p, key
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Winner (%s): %s (state: %s)", "moving" if best[0] else "idle",
+                         winner.id, winner.state.name)
         return winner
 
     def _validate_board(self, pieces: List[Piece]) -> bool:
         """Check that there is exactly one king of each color and no duplicate same-color occupancy."""
         has_white_king = has_black_king = False
-        seen_cells: Dict[Tuple[int, int], str] = {}
+        seen_cells: Dict[Tuple[int, int], int] = {}
         for p in pieces:
             cell = p.current_cell()
             if cell in seen_cells:
-                if seen_cells[cell] == p.id[1]:
+                if seen_cells[cell] == p._color_bit:
                     return False
             else:
-                seen_cells[cell] = p.id[1]
-            if p.id.startswith("KW"):
-                has_white_king = True
-            elif p.id.startswith("KB"):
-                has_black_king = True
+                seen_cells[cell] = p._color_bit
+            if p._is_king:
+                if p._color_bit == 0:
+                    has_white_king = True
+                else:
+                    has_black_king = True
         return has_white_king and has_black_king
 
     def is_game_over(self) -> bool:
         """Determine if the game is over (less than two kings remain)."""
-        kings = [p for p in self.pieces if p.id.startswith(('KW', 'KB'))]
-        return len(kings) < 2
+        return sum(self._kings_alive) < 2
 
     def get_winner(self) -> Optional[str]:
         """Get the winner of the game"""
         if not self.is_game_over():
             return None
         
-        white_king_alive = any(p for p in self.pieces if p.id.startswith('KW'))
-        return "white" if white_king_alive else "black"
+        return "white" if self._kings_alive[0] else "black"
 
     def get_game_state_dict(self) -> dict:
         """Get current game state as dictionary for API"""
-        pieces_state = {}
-        for piece in self.pieces:
-            row, col = piece.current_cell()
-            pieces_state[piece.id] = {
-                "id": piece.id,
-                "type": self._get_piece_type(piece.id),
-                "color": "white" if piece.id[1] == "W" else "black",
+        game_over = self.is_game_over()
+        winner = self.get_winner() if game_over else None
+
+        pieces_state = {
+            p.id: {
+                "id": p.id,
+                "type": _PIECE_TYPES.get(p._kind, "unknown"),
+                "color": _COLOR_NAMES[p._color_bit],
                 "position": {"row": row, "col": col},
                 "is_alive": True
             }
+            for p in self.pieces
+            for row, col in (p._last_cell,)
+        }
         
         return {
             "pieces": pieces_state,
             "board_size": [self.board.H_cells, self.board.W_cells],
-            "game_over": self.is_game_over(),
-            "winner": self.get_winner()
+            "game_over": game_over,
+            "winner": winner
         }
-    
-    def _get_piece_type(self, piece_id: str) -> str:
-        """Get piece type from piece ID"""
-        type_map = {
-            "P": "pawn",
-            "R": "rook", 
-            "N": "knight",
-            "B": "bishop",
-            "Q": "queen",
-            "K": "king"
-        }
-        return type_map.get(piece_id[0], "unknown")
-
-# Keep original Game class for backward compatibility but mark as deprecated
-class Game(ServerGame):
-    """Deprecated: Use ServerGame for server-side logic"""
-    
-    def __init__(self, pieces: List[Piece], board: Board):
-        super().__init__(pieces, board)
-        logger.warning("Using deprecated Game class. Use ServerGame for server-side logic.")
@@ -4,13 +4,22 @@ Improved Chess Game Server - WebSocket Server for Chess Game
 
 import asyncio
 import websockets
-import json
+import orjson
 import logging
 from typing import Dict, Set, Optional, List
 from datetime import datetime
 import sys
 import os
-import traceback
+import signal
+import time
+import itertools
+from collections import deque
+from dataclasses import dataclass
+
+try:
+    import uvloop  # libuv-based event loop; not available on Windows
+except ImportError:
+    uvloop = None
 
 current_dir = os.path.dirname(__file__)
 shared_dir = os.path.join(current_dir, '..', 'shared')
@@ -34,19 +43,90 @@ from Command import Command
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Constant across games, so resolved once instead of on every start_game
+PIECES_PATH = os.path.abspath(os.path.join(current_dir, '..', 'pieces'))
+IMG_FACTORY = MockImgFactory()  # stateless
+
+# Frames a connection may have waiting before it is treated as too slow and dropped
+OUTBOX_SIZE = 256
+
+# Seconds between engine ticks of a started game: moves land, rests expire
+# and captures resolve on the tick, not when the next move happens to arrive
+TICK_SECONDS = 0.05
+
+# Tracebacks logged per second at most; past that, errors log their message only
+TRACEBACKS_PER_SECOND = 10
+
+# Constant-shape reply, encoded once
+_PONG = ProtocolMessage(MessageType.PONG, {}).to_json()
+
+# Player colour → colour letter in piece ids ("PW_(6, 0)" is white)
+COLOR_CHARS = {"white": "W", "black": "B"}
+# Player colour → its bit in a game's colors_taken mask
+COLOR_BITS = {"white": 1, "black": 2}
+
+@dataclass(slots=True)
+class Connection:
+    """Everything the server tracks for one open websocket"""
+    websocket: object
+    outbox: asyncio.Queue  # encoded frames waiting for the writer task; None closes the socket
+    writer: asyncio.Task
+    player_id: Optional[str] = None  # set once the client has joined
+    game_id: Optional[str] = None
+    # The joined game's game_data and this player's entry in it, so message
+    # handlers skip the games/players lookups
+    game_data: Optional[dict] = None
+    player_data: Optional[dict] = None
+
 class ChessGameServer:
     
     def __init__(self):
-        self.clients = {}
+        # websocket -> Connection; every frame to a client goes through its
+        # outbox queue so a slow socket never blocks a sender
+        self.connections: Dict[object, Connection] = {}
+        # Closes of dropped slow clients; the loop keeps only weak references
+        # to tasks, so these are held here until they finish
+        self.closing_tasks: Set[asyncio.Task] = set()
         # שינוי: במקום משתנים יחידים, נשתמש במילון של משחקים
         self.games = {}  # game_id -> game_data
         self.waiting_players = []  # רשימת שחקנים הממתינים למשחק
-        self.player_to_game = {}  # player_id -> game_id
         self.next_game_id = 1
+        # Games with a free seat, oldest first. open_game_ids is the truth;
+        # ids of games that filled up are skipped lazily when they reach the front
+        self.open_games = deque()
+        self.open_game_ids: Set[str] = set()
+        self._player_ids = itertools.count(1)
+        self._traceback_window = 0.0
+        self._tracebacks_left = TRACEBACKS_PER_SECOND
+        # Raw "type" string of an inbound message -> its handler
+        self._handlers = {
+            MessageType.PLAYER_JOIN.value: self.handle_player_join,
+            MessageType.PLAYER_MOVE.value: self.handle_player_move,
+            MessageType.PING.value: self.handle_ping,
+        }
        
-    def register_client(self, websocket, player_id: str):
-        """Add new client to the server."""
-        self.clients[websocket] = player_id
+    def log_exception(self, message: str):
+        """logger.exception, rate limited so a flood of failing messages cannot
+        keep the loop busy formatting tracebacks."""
+        now = time.monotonic()
+        if now - self._traceback_window >= 1.0:
+            self._traceback_window = now
+            self._tracebacks_left = TRACEBACKS_PER_SECOND
+        if self._tracebacks_left > 0:
+            self._tracebacks_left -= 1
+            logger.exception(message)
+        else:
+            logger.error(message)
+            
+    def register_client(self, websocket, player_id: str, game_id: str, game_data: dict, player_data: dict):
+        """Attach a joined player (and their game) to the client's connection."""
+        connection = self.connections.get(websocket)
+        if connection is None:
+            return
+        connection.player_id = player_id
+        connection.game_id = game_id
+        connection.game_data = game_data
+        connection.player_data = player_data
         logger.info(f"Registered client {player_id}")
         
     def create_new_game(self) -> str:
@@ -56,23 +136,61 @@ class ChessGameServer:
         
         # יצירת מבנה נתונים למשחק חדש
         self.games[game_id] = {
+            'game_id': game_id,
             'players': {},
+            # Players with 'connected' set, kept in step by add_player_to_game
+            # and mark_player_disconnected so nothing has to recount the roster
+            'connected_count': 0,
+            # COLOR_BITS of the connected players, kept in step the same way
+            'colors_taken': 0,
             'game': None,
             'game_started': False,
             'current_player': 'white',
-            'created_at': datetime.now()
+            'created_at': datetime.now(),
+            # Bumped on every change; the encoded game_state frame is reused
+            # for as long as it was built from the current version
+            'state_version': 0,
+            'state_payload': None,
+            # The game_state "players" section; only joins and disconnects
+            # change it, so moves reuse it across versions
+            'players_info': None,
+            # The game_state "pieces" columns; only a new game or an accepted
+            # move changes them, so joins and disconnects reuse them
+            'pieces_state': None,
+            # Encoded frames waiting for the next flush: events in order plus
+            # the newest game_state (an older one is superseded) and how many
+            # events were queued before it, and the scheduled callback that
+            # will send them
+            'outbox': [],
+            'outbox_state': None,
+            'outbox_state_pos': 0,
+            'outbox_flush': None,
+            # Advances the engine once the game starts; cancelled with the game
+            'tick_task': None
         }
         
+        self.mark_game_open(game_id)
         logger.info(f"Created new game: {game_id}")
         return game_id
     
     def find_available_game(self) -> Optional[str]:
         """מצא משחק זמין (עם פחות מ-2 שחקנים)"""
-        for game_id, game_data in self.games.items():
-            if len(game_data['players']) < 2:
+        # Only games that have not started are ever queued: a newcomer seated
+        # in a running game would build its board from the starting position
+        open_games = self.open_games
+        while open_games:
+            game_id = open_games[0]
+            if game_id in self.open_game_ids:
                 return game_id
+            open_games.popleft()
         return None
     
+    def mark_game_open(self, game_id: str):
+        """Put a game with a free seat in line for find_available_game."""
+        if game_id not in self.open_game_ids:
+            self.open_game_ids.add(game_id)
+            self.open_games.append(game_id)
+    
     def get_game_data(self, game_id: str) -> Optional[dict]:
         """קבל נתונים של משחק ספציפי"""
         return self.games.get(game_id)
@@ -80,48 +198,75 @@ class ChessGameServer:
     def add_player_to_game(self, game_id: str, player_id: str, player_data: dict):
         """הוסף שחקן למשחק ספציפי"""
         if game_id in self.games:
-            self.games[game_id]['players'][player_id] = player_data
-            self.player_to_game[player_id] = game_id
+            game_data = self.games[game_id]
+            game_data['players'][player_id] = player_data
+            if player_data.get('connected', False):
+                game_data['connected_count'] += 1
+                game_data['colors_taken'] |= COLOR_BITS.get(player_data['color'], 0)
+                if game_data['connected_count'] >= 2:
+                    self.open_game_ids.discard(game_id)
+            game_data['players_info'] = None
+            self.mark_game_changed(game_data)
             logger.info(f"Added player {player_id} to game {game_id}")
     
     def remove_game_if_empty(self, game_id: str):
         """הסר משחק אם הוא ריק"""
         if game_id in self.games:
             game_data = self.games[game_id]
-            if len(game_data['players']) == 0:
+            # Disconnected players keep their entry, so "empty" means nobody connected
+            if game_data['connected_count'] == 0:
                 del self.games[game_id]
+                self.open_game_ids.discard(game_id)
+                if game_data['tick_task']:
+                    game_data['tick_task'].cancel()
                 logger.info(f"Removed empty game: {game_id}")
                 
-    def get_player_game_id(self, player_id: str) -> Optional[str]:
-        """קבל את ה-game_id של שחקן ספציפי"""
-        return self.player_to_game.get(player_id)
-        
+    def mark_game_changed(self, game_data: dict):
+        """Bump the game's state version and drop its cached game_state frame."""
+        game_data['state_version'] += 1
+        game_data['state_payload'] = None
+    
+    def mark_player_disconnected(self, game_data: dict, player_data: dict):
+        """Flag a player as gone, keeping their seat (and colour) for a replacement."""
+        if player_data.get('connected', False):
+            player_data['connected'] = False
+            game_data['connected_count'] -= 1
+            game_data['colors_taken'] &= ~COLOR_BITS.get(player_data['color'], 0)
+            # A started game keeps the leaver's seat empty; the remaining
+            # player stays until they leave too and the game is removed
+            if not game_data['game_started']:
+                self.mark_game_open(game_data['game_id'])
+        player_data['websocket'] = None
+        game_data['players_info'] = None
+        self.mark_game_changed(game_data)
+        # Tell whoever is left; flushed on the next loop pass, after any
+        # remove_game_if_empty, so an emptied game sends nothing
+        game_id = game_data['game_id']
+        self.queue_for_game(game_id, game_data, self.get_game_state_payload(game_id, game_data), is_state=True)
+    
     def unregister_client(self, websocket):
         """Remove client from the server."""
-        if websocket is None:
+        # pop() makes a repeated unregister (e.g. from an error path) a no-op
+        connection = self.connections.pop(websocket, None)
+        if connection is None:
             return
-        if websocket in self.clients:
-            player_id = self.clients[websocket]
-            del self.clients[websocket]
-            
-            # מצא את המשחק של השחקן ונתק אותו
-            game_id = self.get_player_game_id(player_id)
-            if game_id and game_id in self.games:
-                game_data = self.games[game_id]
-                if player_id in game_data['players']:
-                    game_data['players'][player_id]['connected'] = False
-                    logger.info(f"Player {player_id} disconnected from game {game_id}")
-                    
-                    # אם אין שחקנים מחוברים, הסר את המשחק
-                    connected_players = [p for p in game_data['players'].values() if p.get('connected', False)]
-                    if len(connected_players) == 0:
-                        self.remove_game_if_empty(game_id)
-                
-            # הסר מהמיפוי
-            if player_id in self.player_to_game:
-                del self.player_to_game[player_id]
+        connection.writer.cancel()
+        player_id = connection.player_id
+        if player_id is None:
+            return  # never joined a game
+            
+        # מצא את המשחק של השחקן ונתק אותו
+        game_id = connection.game_id
+        player_data = connection.player_data
+        # Already done if the client was dropped as too slow
+        if player_data['websocket'] is websocket:
+            self.mark_player_disconnected(connection.game_data, player_data)
+            logger.info(f"Player {player_id} disconnected from game {game_id}")
+            
+        # אם אין שחקנים מחוברים, הסר את המשחק
+        self.remove_game_if_empty(game_id)
                 
-            logger.info(f"Unregistered client {player_id}")
+        logger.info(f"Unregistered client {player_id}")
             
     def get_pieces_state(self):
         """Get the current state of all pieces in the game."""
@@ -151,19 +296,96 @@ class ChessGameServer:
             
         return pieces_state
             
-    async def send_to_client(self, websocket, message):
+    def send_to_client(self, websocket, message):
+        """Queue a message for one client behind the frames already waiting for it."""
+        if not self.enqueue(websocket, message.to_json()):
+            logger.error("Error sending message to client: outbox unavailable")
+            
+    def close_connection(self, websocket):
+        """Close a client's socket once the frames already queued for it are sent."""
+        connection = self.connections.get(websocket)
+        if connection is None or connection.writer.done():
+            return
         try:
-            await websocket.send(message.to_json())
-        except Exception as e:
-            logger.error(f"Error sending message to client: {e}")
+            connection.outbox.put_nowait(None)
+        except asyncio.QueueFull:
+            self.drop_connection(connection)
+            
+    def drop_connection(self, connection: Connection):
+        """Close a client's socket now, discarding whatever is still queued for it."""
+        connection.writer.cancel()
+        closer = asyncio.create_task(connection.websocket.close())
+        self.closing_tasks.add(closer)
+        closer.add_done_callback(self.closing_tasks.discard)
+
+    def open_connection(self, websocket):
+        """Create a client's Connection: its outbound queue and the task that writes it to the socket."""
+        outbox = asyncio.Queue(maxsize=OUTBOX_SIZE)
+        writer = asyncio.create_task(self.write_outbox(websocket, outbox))
+        self.connections[websocket] = Connection(websocket, outbox, writer)
+        
+    async def write_outbox(self, websocket, outbox: asyncio.Queue):
+        while True:
+            payload = await outbox.get()
+            try:
+                if payload is None:
+                    # From close_connection, after everything queued before it
+                    await websocket.close()
+                    return
+                await websocket.send(payload)
+            except websockets.exceptions.ConnectionClosed:
+                # handle_client sees the close too and unregisters the client
+                return
+            
+    def enqueue(self, websocket, payload: str) -> bool:
+        """Queue an encoded frame for one client without waiting on its socket.
+
+        Returns False if the client has no outbox or has fallen OUTBOX_SIZE
+        frames behind - such a client is disconnected rather than allowed to
+        hold everyone else up.
+        """
+        connection = self.connections.get(websocket)
+        # A writer being cancelled belongs to a client already being dropped
+        if connection is None or connection.writer.done() or connection.writer.cancelling():
+            return False
+        try:
+            connection.outbox.put_nowait(payload)
+            return True
+        except asyncio.QueueFull:
+            logger.warning(f"Dropping slow client {connection.player_id}: outbox full")
+            self.drop_connection(connection)
+            return False
+
+    def send_to_game_players(self, game_data: dict, payload: str):
+        """Queue an already-encoded frame for every connected player of a game.
+
+        Players whose frame could not be queued are marked disconnected.
+        """
+        for player_id, player_data in game_data['players'].items():
+            websocket = player_data.get('websocket')
+            if not websocket or not player_data.get('connected', False):
+                continue
+            if not self.enqueue(websocket, payload):
+                logger.error(f"Error sending to player {player_id}: outbox unavailable")
+                self.mark_player_disconnected(game_data, player_data)
             
     async def handle_player_join(self, websocket, join_data):
         """Handle a new player joining the game - תמיכה במשחקים מרובים"""
-        player_name = join_data.get("player_name")
-        preferred_color = join_data.get("preferred_color")
+        # Same as moves: the protocol record's constructor is the field check
+        try:
+            join = PlayerJoinMessage(**join_data)
+        except TypeError:
+            logger.warning(f"Malformed join: {join_data}")
+            error_msg = create_error_message(ErrorCodes.INVALID_MESSAGE, "Malformed join")
+            self.send_to_client(websocket, error_msg)
+            return
+        player_name = join.player_name
+        preferred_color = join.preferred_color
         
         # יצירת player_id ייחודי
-        player_id = f"player_{len(self.clients) + 1}_{int(datetime.now().timestamp())}"
+        # A plain counter: the old connection-count + whole-second timestamp
+        # repeated when two players joined in the same second after a drop
+        player_id = f"player_{next(self._player_ids)}"
         
         # מצא משחק זמין או צור חדש
         game_id = self.find_available_game()
@@ -171,33 +393,41 @@ class ChessGameServer:
             game_id = self.create_new_game()
         
         game_data = self.get_game_data(game_id)
-        existing_colors = [p['color'] for p in game_data['players'].values()]
+        colors_taken = game_data['colors_taken']
+        preferred_bit = COLOR_BITS.get(preferred_color, 0)
         
         # קבע צבע לשחקן
-        if preferred_color and preferred_color not in existing_colors:
+        if preferred_bit and not colors_taken & preferred_bit:
             assigned_color = preferred_color
         else:
-            if 'white' not in existing_colors:
+            if not colors_taken & 1:
                 assigned_color = 'white'
-            elif 'black' not in existing_colors:
+            elif not colors_taken & 2:
                 assigned_color = 'black'
             else:
                 # זה לא אמור לקרות כי מצאנו משחק זמין
                 error_msg = create_error_message(ErrorCodes.GAME_FULL, "Game is full")
-                await self.send_to_client(websocket, error_msg)
-                await websocket.close()
+                self.send_to_client(websocket, error_msg)
+                self.close_connection(websocket)
                 return
         
+        # Take over the seat of a player who left with this colour. Only games
+        # that never started are offered, so no game is in progress here
+        for old_id, old_data in list(game_data['players'].items()):
+            if old_data['color'] == assigned_color and not old_data.get('connected', False):
+                del game_data['players'][old_id]
+        
         # הוסף שחקן למשחק
         player_data = {
             'name': player_name,
             'color': assigned_color,
+            'color_char': COLOR_CHARS.get(assigned_color, "B"),
             'connected': True,
             'websocket': websocket
         }
         
         self.add_player_to_game(game_id, player_id, player_data)
-        self.register_client(websocket, player_id)
+        self.register_client(websocket, player_id, game_id, game_data, player_data)
         
         logger.info(f"Player {player_name} joined game {game_id} as {assigned_color} (ID: {player_id})")
         
@@ -216,21 +446,62 @@ class ChessGameServer:
             if not game_data:
                 return
             
-            pieces_path = os.path.abspath(os.path.join(current_dir, '..', 'pieces'))
-            logger.info(f"Using pieces path: {pieces_path}")
+            logger.info(f"Using pieces path: {PIECES_PATH}")
             
             # צור משחק חדש עבור ה-game_id הזה
-            game_data['game'] = create_game(pieces_path, MockImgFactory(), game_id)
+            game_data['game'] = create_game(PIECES_PATH, IMG_FACTORY, game_id)
             game_data['game_started'] = True
             game_data['current_player'] = "white"
+            game_data['pieces_state'] = None
+            self.mark_game_changed(game_data)
+            game_data['tick_task'] = asyncio.create_task(self.tick_game(game_data))
             
             await self.broadcast_game_state_to_game(game_id)
             
             logger.info(f"Game {game_id} started successfully!")
             
         except Exception as e:
-            logger.error(f"Error starting game {game_id}: {e}")
-            traceback.print_exc()
+            self.log_exception(f"Error starting game {game_id}: {e}")
+    
+    def get_game_state_payload(self, game_id: str, game_data: dict) -> str:
+        """Encoded game_state frame for the game's current version, built at most once per version"""
+        payload = game_data['state_payload']
+        if payload is not None:
+            return payload
+
+        pieces_state = game_data['pieces_state']
+        if pieces_state is None:
+            pieces_state = game_data['pieces_state'] = self.get_pieces_state_for_game(game_data['game'])
+        
+        players_info = game_data['players_info']
+        if players_info is None:
+            players_info = game_data['players_info'] = {pid: {
+                'name': pdata.get('name', 'Unknown'),
+                'color': pdata.get('color', 'white'),
+                'connected': pdata.get('connected', False)
+            } for pid, pdata in game_data['players'].items()}
+        
+        # קבע סטטוס המשחק
+        if len(game_data['players']) < 2:
+            game_status = "waiting"
+        elif game_data['game_started']:
+            game_status = "active"
+        else:
+            game_status = "ready"
+        
+        # צור הודעת מצב משחק
+        message_data = {
+            "status": game_status,
+            "current_player": game_data['current_player'],
+            "players": players_info,
+            "pieces": pieces_state,
+            "game_id": game_id,  # הוסף את ה-game_id להודעה
+            "state_version": game_data['state_version']
+        }
+        
+        message = ProtocolMessage(MessageType.GAME_STATE, message_data)
+        payload = game_data['state_payload'] = message.to_json()
+        return payload
     
     async def broadcast_game_state_to_game(self, game_id: str):
         """שדר מצב משחק לכל השחקנים במשחק ספציפי"""
@@ -239,134 +510,126 @@ class ChessGameServer:
             return
         
         try:
-            pieces_state = []
-            if game_data['game']:
-                pieces_state = self.get_pieces_state_for_game(game_data['game'])
-            
-            # קבע סטטוס המשחק
-            if len(game_data['players']) < 2:
-                game_status = "waiting"
-            elif game_data['game_started']:
-                game_status = "active"
-            else:
-                game_status = "ready"
-            
-            # צור הודעת מצב משחק
-            message_data = {
-                "status": game_status,
-                "current_player": game_data['current_player'],
-                "players": {pid: {
-                    'name': pdata.get('name', 'Unknown'),
-                    'color': pdata.get('color', 'white'),
-                    'connected': pdata.get('connected', False)
-                } for pid, pdata in game_data['players'].items()},
-                "pieces": pieces_state,
-                "game_id": game_id  # הוסף את ה-game_id להודעה
-            }
-            
             # שלח לכל השחקנים במשחק
-            for player_id, player_data in game_data['players'].items():
-                websocket = player_data.get('websocket')
-                if websocket and player_data.get('connected', False):
-                    try:
-                        message = ProtocolMessage(MessageType.GAME_STATE, message_data)
-                        await websocket.send(message.to_json())
-                    except Exception as e:
-                        logger.error(f"Error sending game state to player {player_id}: {e}")
-                        player_data['connected'] = False
+            payload = self.get_game_state_payload(game_id, game_data)
+            self.queue_for_game(game_id, game_data, payload, is_state=True)
             
         except Exception as e:
-            logger.error(f"Error broadcasting game state for game {game_id}: {e}")
-            traceback.print_exc()
+            self.log_exception(f"Error broadcasting game state for game {game_id}: {e}")
     
     def get_pieces_state_for_game(self, game):
-        """קבל מצב הכלים למשחק ספציפי"""
+        """קבל מצב הכלים למשחק ספציפי
+
+        Columnar: piece i is ids[i] at (rows[i], cols[i]). Parallel arrays
+        carry no per-piece key names, which is most of a per-piece dict's bytes.
+        """
+        ids, rows, cols = [], [], []
         if not game:
-            return []
-            
-        pieces_state = []
+            return {"ids": ids, "rows": rows, "cols": cols}
         
         try:
             for piece in game.piece_by_id.values():
-                piece_dict = {
-                    'id': piece.id,
-                    'position': piece.current_cell(),  # שימוש ב-current_cell() במקום position
-                    'selected': False
-                }
-                pieces_state.append(piece_dict)
+                row, col = piece.current_cell()
+                ids.append(piece.id)
+                rows.append(row)
+                cols.append(col)
                 
         except Exception as e:
             logger.error(f"Error getting pieces state: {e}")
             
-        return pieces_state
+        return {"ids": ids, "rows": rows, "cols": cols}
             
-    def validate_move(self, piece_id: str, player_color: str) -> bool:
+    def validate_move(self, piece_id: str, player_info: dict, game) -> bool:
+        # color_char is resolved once at join, so this is a single compare
         if not piece_id or len(piece_id) < 2:
             return False
             
-        piece_color_char = piece_id[1]
-        expected_char = "W" if player_color == "white" else "B"
-        
-        if piece_color_char != expected_char:
-            logger.warning(f"Player {player_color} tried to move {piece_id} (wrong color)")
+        # Ids that name no live piece (made up, or already captured) stop here
+        # instead of going through command building in the engine
+        if piece_id not in game.piece_by_id:
+            logger.warning(f"Player {player_info['color']} tried to move unknown piece {piece_id}")
+            return False
+            
+        if piece_id[1] != player_info['color_char']:
+            logger.warning(f"Player {player_info['color']} tried to move {piece_id} (wrong color)")
             return False
             
         return True
         
+    async def tick_game(self, game_data: dict):
+        """Advance a started game's engine every TICK_SECONDS until the game is removed."""
+        game = game_data['game']
+        while True:
+            await asyncio.sleep(TICK_SECONDS)
+            if game.update_game_state():
+                game_data['pieces_state'] = None
+                self.mark_game_changed(game_data)
+        
     async def handle_player_move(self, websocket, move_data):
         """Handle a player's move request - תמיכה במשחקים מרובים"""
-        player_id = self.clients.get(websocket)
-        if not player_id:
+        connection = self.connections.get(websocket)
+        if connection is None or connection.player_data is None:
             logger.warning("Move from unregistered client")
             return
+        player_id, game_id = connection.player_id, connection.game_id
         
-        # מצא איזה משחק השחקן שייך אליו
-        game_id = self.player_to_game.get(player_id)
-        if not game_id:
-            logger.warning(f"Player {player_id} is not in any game")
-            return
-            
-        game_data = self.get_game_data(game_id)
-        if not game_data or not game_data.get('game'):
+        # The connection holds the player's game directly
+        game_data = connection.game_data
+        if not game_data['game']:
             logger.warning(f"No game instance available for game {game_id}")
             return
             
-        player_info = game_data['players'].get(player_id)
-        if not player_info:
-            logger.warning(f"Move from unknown player {player_id} in game {game_id}")
+        player_info = connection.player_data
+        if player_info['websocket'] is not websocket:
+            # Dropped as too slow, or the seat has since been taken over
+            logger.warning(f"Move from disconnected player {player_id} in game {game_id}")
             return
             
-        piece_id = move_data.get("piece_id")
-        from_pos = tuple(move_data.get("from_position", [0, 0]))
-        to_pos = tuple(move_data.get("to_position", [0, 0]))
+        # Parse straight into the protocol's move record - one constructor call
+        # checks for exactly the fields the client sends
+        try:
+            move = PlayerMoveMessage(**move_data)
+            piece_id = move.piece_id
+            from_pos = tuple(move.from_cell)
+            to_pos = tuple(move.to_cell)
+        except (TypeError, ValueError):
+            logger.warning(f"Malformed move from {player_id}: {move_data}")
+            error_msg = create_error_message(ErrorCodes.INVALID_MESSAGE, "Malformed move")
+            self.send_to_client(websocket, error_msg)
+            return
         player_color = player_info['color']
         
-        logger.info(f"Processing move from {player_id} ({player_color}) in game {game_id}: {piece_id} {from_pos} -> {to_pos}")
+        # Per-move records use lazy %-args: nothing is formatted unless the level is on
+        logger.debug("Processing move from %s (%s) in game %s: %s %s -> %s",
+                     player_id, player_color, game_id, piece_id, from_pos, to_pos)
         
-        if not self.validate_move(piece_id, player_color):
-            error_msg = create_error_message(ErrorCodes.INVALID_MOVE, "Invalid move - wrong piece color")
-            await self.send_to_client(websocket, error_msg)
+        if not self.validate_move(piece_id, player_info, game_data['game']):
+            error_msg = create_error_message(ErrorCodes.INVALID_MOVE, "Invalid move - unknown piece or wrong piece color")
+            self.send_to_client(websocket, error_msg)
             return
             
         try:
-            cmd = Command(piece_id)
-            cmd.params = [from_pos, to_pos]
+            # Command timestamps are game time; move.timestamp is the client's
+            # wall clock and means nothing to the engine
+            game = game_data['game']
+            cmd = Command(game.game_time_ms(), piece_id, "move", [from_pos, to_pos])
             
-            result = game_data['game']._process_input(cmd)
+            result = game._process_input(cmd)
             
             if result:
+                game_data['pieces_state'] = None
+                self.mark_game_changed(game_data)
                 await self.broadcast_move_made_to_game(game_id, piece_id, from_pos, to_pos, player_color)
-                logger.info(f"Move processed successfully in game {game_id}: {piece_id} {from_pos} -> {to_pos}")
+                logger.info("Move processed successfully in game %s: %s %s -> %s", game_id, piece_id, from_pos, to_pos)
             else:
                 logger.warning(f"Move rejected by game engine in game {game_id}: {piece_id} {from_pos} -> {to_pos}")
                 error_msg = create_error_message(ErrorCodes.INVALID_MOVE, "Move rejected by game engine")
-                await self.send_to_client(websocket, error_msg)
+                self.send_to_client(websocket, error_msg)
                 
         except Exception as e:
-            logger.error(f"Error processing move in game {game_id}: {e}")
-            traceback.print_exc()
+            self.log_exception(f"Error processing move in game {game_id}: {e}")
             error_msg = create_error_message(ErrorCodes.SERVER_ERROR, f"Internal server error: {str(e)}")
-            await self.send_to_client(websocket, error_msg)
+            self.send_to_client(websocket, error_msg)
     
     async def broadcast_move_made_to_game(self, game_id: str, piece_id: str, from_pos: tuple, to_pos: tuple, player_color: str):
         """שדר תזוזה לכל השחקנים במשחק ספציפי"""
@@ -379,46 +642,92 @@ class ChessGameServer:
             "from": from_pos,
             "to": to_pos,
             "color": player_color,
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": time.time_ns() // 1_000_000,  # epoch ms, like client move timestamps
             "game_id": game_id
         }
         
-        message = ProtocolMessage("MOVE_MADE", move_data)
+        message = ProtocolMessage(MessageType.MOVE_MADE, move_data)
+        self.queue_for_game(game_id, game_data, message.to_json())
+        
+    def queue_for_game(self, game_id: str, game_data: dict, payload: str, is_state: bool = False):
+        """Queue an encoded frame for a game's players.
+
+        Everything queued before the flush callback gets to run (i.e. within this
+        event-loop pass) goes out as one frame.
+        """
+        if is_state:
+            game_data['outbox_state'] = payload
+            game_data['outbox_state_pos'] = len(game_data['outbox'])
+        else:
+            game_data['outbox'].append(payload)
+        if game_data['outbox_flush'] is None:
+            game_data['outbox_flush'] = asyncio.get_running_loop().call_soon(self.flush_game_outbox, game_id)
+        
+    def flush_game_outbox(self, game_id: str):
+        """Send a game's queued frames - the frame itself if alone, else one batch frame"""
+        game_data = self.get_game_data(game_id)
+        if not game_data:
+            return
+        
+        frames = game_data['outbox']
+        if game_data['outbox_state'] is not None:
+            # Where it was queued: last only if no event came after it. Events
+            # queued later are newer, and a client applying this state after
+            # them would step back a version
+            frames.insert(game_data['outbox_state_pos'], game_data['outbox_state'])
+        game_data['outbox'] = []
+        game_data['outbox_state'] = None
+        game_data['outbox_flush'] = None
+        if not frames:
+            return
+        
+        if len(frames) == 1:
+            payload = frames[0]
+        else:
+            # Each frame already is a complete {"type", "data"} object - the
+            # shape of a batch item - so they are spliced in, not re-encoded
+            payload = '{"type":"%s","data":[%s]}' % (MessageType.BATCH.value, ",".join(frames))
         
         # שלח לכל השחקנים במשחק
-        for player_id, player_data in game_data['players'].items():
-            websocket = player_data.get('websocket')
-            if websocket and player_data.get('connected', False):
-                try:
-                    await websocket.send(message.to_json())
-                    logger.info(f"Sent move to player {player_id} in game {game_id}: {piece_id} {from_pos} -> {to_pos}")
-                except Exception as e:
-                    logger.error(f"Error sending move to player {player_id}: {e}")
-                    player_data['connected'] = False
+        self.send_to_game_players(game_data, payload)
+        logger.debug("Sent %d message(s) to game %s", len(frames), game_id)
             
+    async def handle_ping(self, websocket, ping_data):
+        self.enqueue(websocket, _PONG)
+        
     async def handle_client_message(self, websocket, message: str):
         try:
-            protocol_msg = ProtocolMessage.from_json(message)
-            message_type = MessageType(protocol_msg.type)
+            # Inbound messages are read once, so they are dispatched on the
+            # raw "type" string without building a ProtocolMessage
+            msg = orjson.loads(message)
+            message_type = msg.get("type")
+            message_data = msg.get("data") or {}
+        except (orjson.JSONDecodeError, AttributeError):
+            # Not JSON, or not a JSON object - the client's fault, no traceback
+            logger.warning("Malformed message from client")
+            error_msg = create_error_message(ErrorCodes.INVALID_MESSAGE, "Invalid message format")
+            self.send_to_client(websocket, error_msg)
+            return
             
-            if message_type == MessageType.PLAYER_JOIN:
-                await self.handle_player_join(websocket, protocol_msg.data)
-                
-            elif message_type == MessageType.PLAYER_MOVE:
-                await self.handle_player_move(websocket, protocol_msg.data)
-                
-            else:
-                logger.warning(f"Unknown message type: {protocol_msg.type}")
-                
+        # A non-str "type" (e.g. a list) is unhashable and would raise out of
+        # the dict lookup, ending the connection
+        handler = self._handlers.get(message_type) if isinstance(message_type, str) else None
+        if handler is None:
+            logger.warning(f"Unknown message type: {message_type}")
+            error_msg = create_error_message(ErrorCodes.INVALID_MESSAGE, "Unknown message type")
+            self.send_to_client(websocket, error_msg)
+            return
+            
+        try:
+            await handler(websocket, message_data)
         except Exception as e:
-            logger.error(f"Error handling client message: {e}")
-            import traceback
-            traceback.print_exc()
+            self.log_exception(f"Error handling client message: {e}")
             error_msg = create_error_message(ErrorCodes.INVALID_MESSAGE, "Invalid message format")
-            await self.send_to_client(websocket, error_msg)
+            self.send_to_client(websocket, error_msg)
             
     async def handle_client(self, websocket):
         logger.info(f"New client connected from {websocket.remote_address}")
+        self.open_connection(websocket)
         
         try:
             async for message in websocket:
@@ -440,11 +749,29 @@ async def run_server():
     
     logger.info(f"Starting chess server on {host}:{port}")
     
-    async with websockets.serve(server.handle_client, host, port):
+    # Game frames are small JSON; permessage-deflate costs more CPU than it saves.
+    # Client messages are a few hundred bytes, so inbound frames are capped
+    # well below the 1 MiB default
+    async with websockets.serve(server.handle_client, host, port, compression=None,
+                                max_size=2**16):
         logger.info("Chess server started! Waiting for connections...")
-        await asyncio.Future()
+        
+        # Railway stops containers with SIGTERM; leaving the serve() block
+        # closes every connection cleanly instead of the process being killed
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            try:
+                loop.add_signal_handler(sig, stop.set)
+            except (NotImplementedError, RuntimeError):
+                pass  # no loop signal handlers on Windows; Ctrl+C still raises KeyboardInterrupt
+        await stop.wait()
+        logger.info("Shutdown signal received, closing connections...")
 
 if __name__ == "__main__":
+    if uvloop is not None:
+        uvloop.install()
+    
     try:
         asyncio.run(run_server())
     except KeyboardInterrupt:
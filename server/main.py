@@ -16,6 +16,11 @@ sys.path.insert(0, str(current_dir))
 from improved_game_server import run_server
 import asyncio
 
+try:
+    import uvloop  # libuv-based event loop; not available on Windows
+except ImportError:
+    uvloop = None
+
 # Configure logging for production
 logging.basicConfig(
     level=logging.INFO,
@@ -34,6 +39,10 @@ def main():
     logger.info(f"Host: {os.getenv('HOST', '0.0.0.0')}")  
     logger.info(f"Port: {os.getenv('PORT', '8000')}")
     
+    if uvloop is not None:
+        uvloop.install()
+        logger.info("Using uvloop event loop")
+    
     try:
         asyncio.run(run_server())
     except KeyboardInterrupt:
@@ -1,6 +1,7 @@
 from enums.EventType import EventType
 from message_bus import subscribe
 import time
+from collections import deque
 import cv2
 
 MAX_ROWS = 8  # Maximum number of recent moves displayed per player
@@ -11,7 +12,8 @@ class MoveLog:
     Records every move and can draw a graphical table on screen.
     """
     def __init__(self):
-        self.moves = {"WHITE": [], "BLACK": []}
+        # Bounded: appending past MAX_ROWS drops the oldest move
+        self.moves = {"WHITE": deque(maxlen=MAX_ROWS), "BLACK": deque(maxlen=MAX_ROWS)}
         subscribe(EventType.PIECE_MOVED, self._record)
 
     def _record(self, data):
@@ -19,8 +21,6 @@ class MoveLog:
         player = "WHITE" if piece_id[1] == "W" else "BLACK"
         current_time = time.strftime("%H:%M:%S", time.localtime())
         self.moves[player].append((current_time, piece_id))
-        for key in ("WHITE", "BLACK"):
-            self.moves[key] = self.moves[key][-MAX_ROWS:]
 
     def draw(self, img, origin=(1660, 30), player="WHITE"):
         """
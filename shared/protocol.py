@@ -5,7 +5,7 @@ Protocol definition for Chess Game Client-Server communication
 from enum import Enum
 from typing import Dict, List, Tuple, Any, Optional
 from dataclasses import dataclass
-import json
+import orjson
 
 # Default server configuration
 DEFAULT_SERVER_HOST = "localhost"
@@ -27,6 +27,15 @@ class MessageType(Enum):
     ERROR = "error"
     PING = "ping"
     PONG = "pong"
+    BATCH = "batch"  # data: list of {"type", "data"} messages sent as one frame
+
+# Wire value → MessageType; a plain dict lookup instead of Enum's value
+# resolution, which raises (and so costs a traceback object) on unknown values
+_MESSAGE_TYPES = {m.value: m for m in MessageType}
+
+def parse_message_type(value: str) -> Optional[MessageType]:
+    """MessageType for a wire "type" string, or None if it is not one"""
+    return _MESSAGE_TYPES.get(value)
 
 class ErrorCodes:
     PLAYER_NOT_FOUND = "PLAYER_NOT_FOUND"
@@ -38,13 +47,13 @@ class ErrorCodes:
     SERVER_ERROR = "SERVER_ERROR"          # הוספתי את זה
     INVALID_MESSAGE = "INVALID_MESSAGE"    # הוספתי את זה
 
-@dataclass
+@dataclass(slots=True)
 class PlayerJoinMessage:
     """Player join message"""
     player_name: str
     preferred_color: Optional[str] = None
 
-@dataclass 
+@dataclass(slots=True)
 class PlayerMoveMessage:
     """Move message from client"""
     piece_id: str
@@ -52,20 +61,20 @@ class PlayerMoveMessage:
     to_cell: Tuple[int, int]
     timestamp: int
 
-@dataclass
+@dataclass(slots=True)
 class PlayerJumpMessage:
     """Jump message"""
     piece_id: str
     target_cell: Tuple[int, int]
     timestamp: int
 
-@dataclass
+@dataclass(slots=True)
 class PlayerSelectMessage:
     """Piece selection message"""
     piece_id: str
     timestamp: int
 
-@dataclass
+@dataclass(slots=True)
 class PieceState:
     """Piece state in game"""
     id: str
@@ -76,7 +85,19 @@ class PieceState:
     can_be_captured: bool
     is_selected: bool = False
 
-@dataclass
+    def to_dict(self) -> Dict[str, Any]:
+        """Plain dict of primitives, ready for serialization"""
+        return {
+            "id": self.id,
+            "position": self.position,
+            "piece_type": self.piece_type,
+            "color": self.color,
+            "state_name": self.state_name,
+            "can_be_captured": self.can_be_captured,
+            "is_selected": self.is_selected
+        }
+
+@dataclass(slots=True)
 class GameStateMessage:
     """Complete game state message"""
     pieces: List[PieceState]
@@ -86,7 +107,7 @@ class GameStateMessage:
     winner: Optional[str] = None
     selected_pieces: Dict[str, str] = None
 
-@dataclass
+@dataclass(slots=True)
 class MoveResultMessage:
     """Move result message"""
     success: bool
@@ -95,14 +116,14 @@ class MoveResultMessage:
     to_cell: Tuple[int, int]
     error_message: Optional[str] = None
 
-@dataclass
+@dataclass(slots=True)
 class ErrorMessage:
     """Error message"""
     error_code: str
     message: str
     details: Optional[Dict[str, Any]] = None
 
-@dataclass
+@dataclass(slots=True)
 class ProtocolMessage:
     """Generic protocol message"""
     type: MessageType
@@ -110,16 +131,19 @@ class ProtocolMessage:
     
     def to_json(self) -> str:
         """Convert to JSON string for transmission"""
-        return json.dumps({
+        # Still a str so it goes out as a text frame (the web client expects text)
+        return orjson.dumps({
             "type": self.type.value,
             "data": self.data
-        })
+        }).decode()
     
     @classmethod
     def from_json(cls, json_str: str) -> 'ProtocolMessage':
-        """Create from received JSON"""
-        data = json.loads(json_str)
-        message_type = MessageType(data["type"])
+        """Create from received JSON (accepts text or binary frames)"""
+        data = orjson.loads(json_str)
+        message_type = parse_message_type(data["type"])
+        if message_type is None:
+            raise ValueError(f"Unknown message type: {data['type']!r}")
         message_data = data.get("data", {})
         return cls(message_type, message_data)
 
@@ -178,7 +202,7 @@ def create_game_state_message(pieces: List[PieceState], current_player: str,
     return ProtocolMessage(
         MessageType.GAME_STATE,
         {
-            "pieces": [piece.__dict__ for piece in pieces],
+            "pieces": [piece.to_dict() for piece in pieces],
             "current_player": current_player,
             "move_log": move_log,
             "game_status": game_status,
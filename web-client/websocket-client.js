@@ -110,8 +110,19 @@ class ChessWebSocketClient {
         try {
             const message = JSON.parse(data);
             console.log('Received message:', message);
+            this.dispatchMessage(message);
+        } catch (error) {
+            console.error('Failed to parse message:', error, data);
+        }
+    }
 
+    dispatchMessage(message) {
+        try {
             switch (message.type) {
+                case 'batch':
+                    // Several messages the server sent as one frame
+                    message.data.forEach(item => this.dispatchMessage(item));
+                    break;
                 case 'game_state':
                     this.handleGameState(message.data);
                     break;
@@ -128,7 +139,7 @@ class ChessWebSocketClient {
                     console.warn('Unknown message type:', message.type);
             }
         } catch (error) {
-            console.error('Failed to parse message:', error, data);
+            console.error('Failed to handle message:', error, message);
         }
     }
 